@@ -1,39 +1,44 @@
 """Export SQ structured data to JSON, CSV, and Excel."""
 import csv
-import json
 from pathlib import Path
-from io import StringIO
+from io import BytesIO, StringIO
+from typing import Iterator
+
+import orjson
 
 from app.schema import SQStructuredData
 
+CSV_COLUMNS = [
+    "sr_no",
+    "name",
+    "description",
+    "dimensions",
+    "area",
+    "material",
+    "finish",
+    "qty",
+    "unit_price",
+    "amount",
+]
+
 
 def export_json(data: SQStructuredData, path: str | Path | None = None) -> str:
     """Export to JSON; optionally write to file. Returns JSON string."""
-    out = data.model_dump_json(indent=2)
+    out = orjson.dumps(data.model_dump(mode="json"), option=orjson.OPT_INDENT_2).decode()
     if path:
         Path(path).write_text(out, encoding="utf-8")
     return out
 
 
-def export_csv(data: SQStructuredData, path: str | Path | None = None) -> str:
-    """Export products table to CSV; optionally write to file. Returns CSV string."""
-    buffer = StringIO()
-    w = csv.writer(buffer)
-    w.writerow(
-        [
-            "sr_no",
-            "name",
-            "description",
-            "dimensions",
-            "area",
-            "material",
-            "finish",
-            "qty",
-            "unit_price",
-            "amount",
-        ]
-    )
+def iter_csv_rows(data: SQStructuredData) -> Iterator[str]:
+    """Yield CSV lines (header, then one per product) so responses can stream."""
+    buf = StringIO()
+    w = csv.writer(buf)
+    w.writerow(CSV_COLUMNS)
+    yield buf.getvalue()
     for p in data.products:
+        buf.seek(0)
+        buf.truncate(0)
         w.writerow(
             [
                 p.sr_no,
@@ -48,39 +53,38 @@ def export_csv(data: SQStructuredData, path: str | Path | None = None) -> str:
                 p.amount,
             ]
         )
-    out = buffer.getvalue()
+        yield buf.getvalue()
+
+
+def export_csv(data: SQStructuredData, path: str | Path | None = None) -> str:
+    """Export products table to CSV; optionally write to file. Returns CSV string."""
+    out = "".join(iter_csv_rows(data))
     if path:
         Path(path).write_text(out, encoding="utf-8")
     return out
 
 
-def export_excel(data: SQStructuredData, path: str | Path) -> None:
-    """Export to Excel matching SQ format (header block + product table + summary)."""
-    import xlsxwriter
-
-    path = Path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    workbook = xlsxwriter.Workbook(str(path))
+def _write_workbook(data: SQStructuredData, workbook) -> None:
+    """Write the SQ sheet (header block + product table + summary) and close."""
     ws = workbook.add_worksheet("SQ")
 
+    # Formats are created once up front; re-creating them per row is a known
+    # xlsxwriter performance trap.
     header = workbook.add_format({"bold": True})
     row = 0
     proj = data.project
-    ws.write(row, 0, "Project Name", header)
-    ws.write(row, 1, proj.project_name)
-    row += 1
-    ws.write(row, 0, "Client Name", header)
-    ws.write(row, 1, proj.client_name)
-    row += 1
-    ws.write(row, 0, "Quotation No", header)
-    ws.write(row, 1, proj.quotation_no)
-    row += 1
-    ws.write(row, 0, "Date", header)
-    ws.write(row, 1, proj.date)
+    header_block = [
+        ("Project Name", proj.project_name),
+        ("Client Name", proj.client_name),
+        ("Quotation No", proj.quotation_no),
+        ("Date", proj.date),
+        ("Prepared By", proj.prepared_by),
+    ]
+    for label, value in header_block:
+        ws.write(row, 0, label, header)
+        ws.write(row, 1, value)
+        row += 1
     row += 1
-    ws.write(row, 0, "Prepared By", header)
-    ws.write(row, 1, proj.prepared_by)
-    row += 2
 
     # Table header
     cols = [
@@ -94,29 +98,61 @@ def export_excel(data: SQStructuredData, path: str | Path) -> None:
         "Rate",
         "Amount",
     ]
-    for c, col in enumerate(cols):
-        ws.write(row, c, col, header)
+    ws.write_row(row, 0, cols, header)
     row += 1
     for p in data.products:
-        ws.write(row, 0, p.sr_no)
-        ws.write(row, 1, p.name or p.description)
-        ws.write(row, 2, p.dimensions)
-        ws.write(row, 3, p.area)
-        ws.write(row, 4, p.material)
-        ws.write(row, 5, p.finish)
-        ws.write(row, 6, p.qty)
-        ws.write(row, 7, p.unit_price)
-        ws.write(row, 8, p.amount)
+        ws.write_row(
+            row,
+            0,
+            [
+                p.sr_no,
+                p.name or p.description,
+                p.dimensions,
+                p.area,
+                p.material,
+                p.finish,
+                p.qty,
+                p.unit_price,
+                p.amount,
+            ],
+        )
         row += 1
     row += 1
     s = data.summary
-    ws.write(row, 0, "Subtotal", header)
-    ws.write(row, 1, s.subtotal)
-    row += 1
-    ws.write(row, 0, "Tax", header)
-    ws.write(row, 1, s.tax)
-    row += 1
-    ws.write(row, 0, "Grand Total", header)
-    ws.write(row, 1, s.grand_total)
+    for label, value in [
+        ("Subtotal", s.subtotal),
+        ("Tax", s.tax),
+        ("Grand Total", s.grand_total),
+    ]:
+        ws.write(row, 0, label, header)
+        ws.write(row, 1, value)
+        row += 1
 
     workbook.close()
+
+
+def export_excel(data: SQStructuredData, path: str | Path) -> None:
+    """Export to Excel matching SQ format (header block + product table + summary)."""
+    import xlsxwriter
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # constant_memory flushes each finished row to a temp file instead of
+    # keeping every cell in RAM until close(); all writes are strictly
+    # top-to-bottom so the monotonic-row requirement holds.
+    workbook = xlsxwriter.Workbook(
+        str(path), {"constant_memory": True, "tmpdir": str(path.parent)}
+    )
+    _write_workbook(data, workbook)
+
+
+def export_excel_bytes(data: SQStructuredData) -> bytes:
+    """Export to Excel in memory (for HTTP responses — no disk round-trip)."""
+    import xlsxwriter
+
+    buf = BytesIO()
+    # in_memory keeps xlsxwriter's package assembly off the filesystem
+    # entirely (it supersedes constant_memory, which needs temp files).
+    workbook = xlsxwriter.Workbook(buf, {"in_memory": True})
+    _write_workbook(data, workbook)
+    return buf.getvalue()
@@ -50,16 +50,20 @@ TYPE_KEYWORDS = {
     "room divider": "Other",
 }
 
+# Single alternation over all keywords, longest first so specific phrases
+# ("kitchen cabinet") win over their substrings ("cabinet"). One linear scan
+# per name instead of one substring search per keyword.
+_KW_RE = re.compile(
+    "|".join(re.escape(k) for k in sorted(TYPE_KEYWORDS, key=len, reverse=True))
+)
+
 
 def classify_product_type(name: str) -> str:
     """Classify product type from name (keyword-based). Returns one of PRODUCT_TYPES."""
     if not name:
         return "Other"
-    lower = name.lower().strip()
-    for kw, ptype in TYPE_KEYWORDS.items():
-        if kw in lower:
-            return ptype
-    return "Other"
+    m = _KW_RE.search(name.lower().strip())
+    return TYPE_KEYWORDS[m.group(0)] if m else "Other"
 
 
 def classify_view(name: str, image_base64: Optional[str] = None) -> str:
@@ -1,24 +1,103 @@
 """
 Minimal API: POST /api/sq/parse (file upload) returning structured data + validation errors.
 """
+import hashlib
 import html
+import string
+import tempfile
+from dataclasses import asdict
+from collections import OrderedDict
 from pathlib import Path
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body
-from fastapi.responses import JSONResponse, Response, HTMLResponse, FileResponse
+import orjson
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Request
+from fastapi.responses import ORJSONResponse, Response, HTMLResponse, FileResponse, StreamingResponse
+from fastapi.routing import APIRoute
 
 from app.schema import ParseResult, SQStructuredData
 from app.pdf_pipeline import parse_pdf_with_validation
-from app.export import export_json, export_csv, export_excel
+from app.export import export_json, export_excel, export_excel_bytes, iter_csv_rows
 from app.template_extractor import extract_template_to_json
 from app.ppt_generator import generate_ppt
 from app.sow_generator import generate_sow, SOWOutput
 
+class ORJSONRequest(Request):
+    """Request whose json() parses with orjson instead of stdlib json.
+
+    The PPT/SOW endpoints accept SQStructuredData bodies that can carry many
+    base64 product images; orjson parses those large payloads several times
+    faster, and Pydantic v2 validates the resulting dict directly.
+    """
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+class ORJSONRoute(APIRoute):
+    """Route class wrapping every request in ORJSONRequest."""
+
+    def get_route_handler(self):
+        original_route_handler = super().get_route_handler()
+
+        async def custom_route_handler(request: Request) -> Response:
+            return await original_route_handler(ORJSONRequest(request.scope, request.receive))
+
+        return custom_route_handler
+
+
 app = FastAPI(
     title="SQ Intelligence Engine API",
     description="Phase 1–3: Parse SQ PDFs, PPT, SOW",
     version="0.2.0",
+    default_response_class=ORJSONResponse,
 )
+# Must be set before routes are registered so the decorators pick it up.
+app.router.route_class = ORJSONRoute
+
+
+async def spool_upload(file: UploadFile) -> tuple[Path, str]:
+    """
+    Stream an upload to a temp file in 1 MiB chunks (never the whole PDF in
+    memory, and never the user-supplied filename as a path), hashing the
+    content in the same pass. Returns (path, content digest); caller unlinks.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as f:
+        try:
+            while chunk := await file.read(1 << 20):
+                h.update(chunk)
+                f.write(chunk)
+        except BaseException:
+            # Aborted upload (client disconnect raises CancelledError): don't
+            # leave the half-written temp file behind — the caller's cleanup
+            # never sees its path.
+            f.close()
+            Path(f.name).unlink(missing_ok=True)
+            raise
+    return Path(f.name), h.hexdigest()
+
+
+# Recently parsed PDFs keyed by content digest. Users commonly hit /parse,
+# /parse/html, and the export endpoints with the same file back to back;
+# parsing + OCR + image extraction can take seconds each time.
+_PARSE_CACHE: OrderedDict[tuple[str, bool], tuple] = OrderedDict()
+_PARSE_CACHE_MAX = 64
+
+
+def _parse_cached(digest: str, pdf_path: Path, extract_images: bool = True):
+    """parse_pdf_with_validation with a small LRU keyed by content digest."""
+    key = (digest, extract_images)
+    cached = _PARSE_CACHE.get(key)
+    if cached is not None:
+        _PARSE_CACHE.move_to_end(key)
+        return cached
+    result = parse_pdf_with_validation(pdf_path, extract_images=extract_images)
+    _PARSE_CACHE[key] = result
+    if len(_PARSE_CACHE) > _PARSE_CACHE_MAX:
+        _PARSE_CACHE.popitem(last=False)
+    return result
 
 
 @app.get("/")
@@ -39,11 +118,9 @@ async def parse_sq_pdf(file: UploadFile = File(...)):
     """
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
-    contents = await file.read()
-    tmp = Path(file.filename)
-    tmp.write_bytes(contents)
+    tmp, digest = await spool_upload(file)
     try:
-        data, validation_errors = parse_pdf_with_validation(tmp)
+        data, validation_errors = _parse_cached(digest, tmp)
         return ParseResult(data=data, validation_errors=validation_errors)
     finally:
         if tmp.exists():
@@ -74,12 +151,10 @@ async def export_sq_json(file: UploadFile = File(...)):
     """Parse PDF and return JSON export only."""
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
-    contents = await file.read()
-    tmp = Path(file.filename)
-    tmp.write_bytes(contents)
+    tmp, digest = await spool_upload(file)
     try:
-        data, _ = parse_pdf_with_validation(tmp)
-        return JSONResponse(content=data.model_dump(), media_type="application/json")
+        data, _ = _parse_cached(digest, tmp, extract_images=False)
+        return ORJSONResponse(content=data.model_dump())
     finally:
         if tmp.exists():
             tmp.unlink()
@@ -90,80 +165,56 @@ async def export_sq_csv(file: UploadFile = File(...)):
     """Parse PDF and return CSV export (products table)."""
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
-    contents = await file.read()
-    tmp = Path(file.filename)
-    tmp.write_bytes(contents)
+    tmp, digest = await spool_upload(file)
     try:
-        data, _ = parse_pdf_with_validation(tmp)
-        csv_str = export_csv(data)
-        return Response(content=csv_str, media_type="text/csv")
+        data, _ = _parse_cached(digest, tmp, extract_images=False)
+        return StreamingResponse(iter_csv_rows(data), media_type="text/csv")
     finally:
         if tmp.exists():
             tmp.unlink()
 
 
-def _table_row_html(product, index: int) -> str:
-    """One table row with Reference Image cell showing image visually."""
-    def esc(s: str) -> str:
-        return html.escape(str(s)) if s else ""
-    img_cell = ""
-    if product.images:
-        for b64 in product.images[:3]:  # up to 3 images per product
-            img_cell += f'<img src="data:image/png;base64,{b64}" alt="Ref" style="max-width:120px;max-height:80px;object-fit:contain;display:block;margin:2px;" />'
-    if not img_cell:
-        img_cell = "<span>—</span>"
-    desc = (product.description[:80] + "…") if len(product.description) > 80 else product.description
-    return (
-        f"<tr>"
-        f"<td>{product.sr_no}</td>"
-        f"<td>{esc(product.name)}</td>"
-        f"<td>{esc(desc)}</td>"
-        f"<td>{esc(product.dimensions)}</td>"
-        f"<td>{esc(product.area)}</td>"
-        f"<td>{esc(product.material)}</td>"
-        f"<td>{esc(product.finish)}</td>"
-        f"<td>{product.qty}</td>"
-        f"<td>{product.unit_price}</td>"
-        f"<td>{product.amount}</td>"
-        f"<td>{img_cell}</td>"
-        f"</tr>"
-    )
-
-
-@app.post("/api/sq/parse/html", response_class=HTMLResponse)
-async def parse_sq_pdf_html(file: UploadFile = File(...)):
-    """
-    Upload an SQ PDF; returns an HTML page with a table showing product details
-    and images in the Reference Image column (visual).
-    """
+@app.post("/api/sq/export/excel")
+async def export_sq_excel(file: UploadFile = File(...)):
+    """Parse PDF and return Excel export (SQ sheet), built in memory."""
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
-    contents = await file.read()
-    tmp = Path(file.filename)
-    tmp.write_bytes(contents)
+    tmp, digest = await spool_upload(file)
     try:
-        data, _ = parse_pdf_with_validation(tmp)
-        proj = data.project
-        rows_html = "".join(_table_row_html(p, i) for i, p in enumerate(data.products))
-        html_content = f"""<!DOCTYPE html>
+        data, _ = _parse_cached(digest, tmp, extract_images=False)
+        return Response(
+            content=export_excel_bytes(data),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": "attachment; filename=sq_output.xlsx"},
+        )
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+_esc = html.escape
+
+# Static page shell built once at import; only $rows and the header fields are
+# substituted per request (string.Template, so the CSS braces stay literal).
+_PAGE_TEMPLATE = string.Template("""<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
   <title>SQ Parse Result</title>
   <style>
-    body {{ font-family: system-ui, sans-serif; margin: 1rem; background: #f5f5f5; }}
-    h1 {{ font-size: 1.25rem; margin-bottom: 0.5rem; }}
-    .meta {{ color: #666; margin-bottom: 1rem; }}
-    table {{ border-collapse: collapse; background: #fff; box-shadow: 0 1px 3px rgba(0,0,0,.1); width: 100%; }}
-    th, td {{ border: 1px solid #ddd; padding: 8px 10px; text-align: left; vertical-align: top; }}
-    th {{ background: #f0f0f0; font-weight: 600; }}
-    td img {{ vertical-align: middle; }}
+    body { font-family: system-ui, sans-serif; margin: 1rem; background: #f5f5f5; }
+    h1 { font-size: 1.25rem; margin-bottom: 0.5rem; }
+    .meta { color: #666; margin-bottom: 1rem; }
+    table { border-collapse: collapse; background: #fff; box-shadow: 0 1px 3px rgba(0,0,0,.1); width: 100%; }
+    th, td { border: 1px solid #ddd; padding: 8px 10px; text-align: left; vertical-align: top; }
+    th { background: #f0f0f0; font-weight: 600; }
+    td img { vertical-align: middle; }
   </style>
 </head>
 <body>
   <h1>SQ Parse Result</h1>
-  <div class="meta">Project: {html.escape(proj.project_name or '—')} | Client: {html.escape(proj.client_name or '—')} | Date: {html.escape(proj.date or '—')}</div>
+  <div class="meta">Project: $project | Client: $client | Date: $date</div>
   <table>
     <thead>
       <tr>
@@ -181,11 +232,64 @@ async def parse_sq_pdf_html(file: UploadFile = File(...)):
       </tr>
     </thead>
     <tbody>
-      {rows_html}
+      $rows
     </tbody>
   </table>
 </body>
-</html>"""
+</html>""")
+
+
+def _table_row_html(product, extracted_images: list[str]) -> str:
+    """One table row with Reference Image cell showing image visually."""
+    if product.images:
+        img_cell = "".join(
+            f'<img src="data:image/png;base64,{extracted_images[i]}" alt="Ref" style="max-width:120px;max-height:80px;object-fit:contain;display:block;margin:2px;" />'
+            for i in product.images[:3]  # up to 3 images per product
+            if 0 <= i < len(extracted_images)
+        )
+        img_cell = img_cell or "<span>—</span>"
+    else:
+        img_cell = "<span>—</span>"
+    desc = (product.description[:80] + "…") if len(product.description) > 80 else product.description
+    parts = ["<tr>"]
+    append = parts.append
+    for cell in (
+        product.sr_no,
+        _esc(product.name) if product.name else "",
+        _esc(desc) if desc else "",
+        _esc(product.dimensions) if product.dimensions else "",
+        _esc(product.area) if product.area else "",
+        _esc(product.material) if product.material else "",
+        _esc(product.finish) if product.finish else "",
+        product.qty,
+        product.unit_price,
+        product.amount,
+    ):
+        append(f"<td>{cell}</td>")
+    append(f"<td>{img_cell}</td>")
+    append("</tr>")
+    return "".join(parts)
+
+
+@app.post("/api/sq/parse/html", response_class=HTMLResponse)
+async def parse_sq_pdf_html(file: UploadFile = File(...)):
+    """
+    Upload an SQ PDF; returns an HTML page with a table showing product details
+    and images in the Reference Image column (visual).
+    """
+    if not file.filename or not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    tmp, digest = await spool_upload(file)
+    try:
+        data, _ = _parse_cached(digest, tmp)
+        proj = data.project
+        rows_html = "".join(_table_row_html(p, data.extracted_images) for p in data.products)
+        html_content = _PAGE_TEMPLATE.substitute(
+            project=html.escape(proj.project_name or "—"),
+            client=html.escape(proj.client_name or "—"),
+            date=html.escape(proj.date or "—"),
+            rows=rows_html,
+        )
         return HTMLResponse(content=html_content)
     finally:
         if tmp.exists():
@@ -219,7 +323,7 @@ async def api_sow_create(data: SQStructuredData = Body(..., embed=False)):
     """
     try:
         sow = generate_sow(data)
-        return JSONResponse(content=sow.model_dump(), media_type="application/json")
+        return ORJSONResponse(content=asdict(sow))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
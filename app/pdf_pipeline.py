@@ -2,13 +2,18 @@
 PDF pipeline: parse SQ PDF -> structured data (project, products, summary)
 with template anchor detection and table extraction.
 """
-import base64
+import os
 import re
+
+try:
+    import pybase64 as base64  # SIMD base64; ~7-10x faster on large payloads
+except ImportError:
+    import base64
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Optional
 
-from pypdf import PdfReader
-
 from app.schema import (
     SQStructuredData,
     Project,
@@ -19,42 +24,79 @@ from app.template_config import TemplateConfig
 from app.validation import validate_sq_data, _safe_float
 
 
-def extract_images_from_pdf(pdf_path: str | Path, max_images: int = 50) -> list[str]:
-    """Extract embedded images from PDF as base64 PNG strings; fallback to page renders if none found."""
-    out: list[str] = []
+def _extract_page_images(pdf_path: str, page_index: int, max_images: int) -> list[bytes]:
+    """
+    Worker: extract embedded images from a single page. Opens its own document
+    handle because PyMuPDF documents are not safe to share across threads.
+    """
+    out: list[bytes] = []
     try:
         import fitz
         doc = fitz.open(pdf_path)
-        # 1) Embedded XObject images via get_images + extract_image
-        for page in doc:
-            for img in page.get_images(full=True):
+        page = doc.load_page(page_index)
+        # Embedded XObject images via get_images + extract_image
+        for img in page.get_images(full=True):
+            if len(out) >= max_images:
+                break
+            xref = img[0]
+            try:
+                base_img = doc.extract_image(xref)
+                if base_img:
+                    b = base_img.get("image")
+                    if b:
+                        out.append(b)
+                        continue
+            except Exception:
+                pass
+            # Fallback: build Pixmap from xref and export as PNG
+            try:
+                pix = fitz.Pixmap(doc, xref)
+                if pix.n > 4:
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                img_bytes = pix.tobytes(output="png")
+                pix = None
+                if img_bytes:
+                    out.append(img_bytes)
+            except Exception:
+                pass
+        doc.close()
+    except Exception:
+        pass
+    return out
+
+
+def extract_images_from_pdf(pdf_path: str | Path, max_images: int = 50) -> list[bytes]:
+    """Extract embedded images from PDF as raw PNG bytes; fallback to page renders if none found.
+
+    Pages are processed in a thread pool (PyMuPDF releases the GIL in its C
+    extraction/encoding routines) and merged back in page order. Returns raw
+    bytes; base64 encoding happens once at the schema boundary
+    (see parse_pdf_to_structured_data) so images are not held encoded twice.
+    """
+    out: list[bytes] = []
+    try:
+        import fitz
+        doc = fitz.open(pdf_path)
+        page_count = doc.page_count
+        doc.close()
+        if page_count <= 1:
+            per_page = [_extract_page_images(str(pdf_path), i, max_images) for i in range(page_count)]
+        else:
+            workers = min(8, os.cpu_count() or 1, page_count)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                per_page = list(
+                    pool.map(partial(_extract_page_images, str(pdf_path), max_images=max_images), range(page_count))
+                )
+        for page_images in per_page:
+            for b in page_images:
                 if len(out) >= max_images:
                     break
-                xref = img[0]
-                try:
-                    base_img = doc.extract_image(xref)
-                    if base_img:
-                        b = base_img.get("image")
-                        if b:
-                            out.append(base64.b64encode(b).decode("ascii"))
-                            continue
-                except Exception:
-                    pass
-                # Fallback: build Pixmap from xref and export as PNG
-                try:
-                    pix = fitz.Pixmap(doc, xref)
-                    if pix.n > 4:
-                        pix = fitz.Pixmap(fitz.csRGB, pix)
-                    img_bytes = pix.tobytes(output="png")
-                    pix = None
-                    if img_bytes:
-                        out.append(base64.b64encode(img_bytes).decode("ascii"))
-                except Exception:
-                    pass
+                out.append(b)
             if len(out) >= max_images:
                 break
-        # 2) If no embedded images, render each page to PNG so user still gets visuals
+        # If no embedded images, render each page to PNG so user still gets visuals
         if len(out) == 0:
+            doc = fitz.open(pdf_path)
             for i, page in enumerate(doc):
                 if len(out) >= max_images:
                     break
@@ -64,15 +106,44 @@ def extract_images_from_pdf(pdf_path: str | Path, max_images: int = 50) -> list[
                     img_bytes = pix.tobytes(output="png")
                     pix = None
                     if img_bytes:
-                        out.append(base64.b64encode(img_bytes).decode("ascii"))
+                        out.append(img_bytes)
                 except Exception:
                     pass
-        doc.close()
+            doc.close()
     except Exception:
         pass
     return out
 
 
+# Precompiled patterns for the per-line parsing loops (skips the re-cache
+# lookup on every call; these run per line of extracted text).
+_RE_TOTAL_LINE = re.compile(r"^(sub\s*total|total|grand\s*total|tax)", re.I)
+_RE_PRODUCT_START = re.compile(r"^\s*(\d+)\s+(.+)$")
+_RE_PRICE_NUMS = re.compile(r"[\d.]+")
+_RE_INT_NUMS = re.compile(r"[\d,]+")
+_RE_ONLY_NUMS_LINE = re.compile(r"^\s*[₹\s\d,.]+\s*$")
+_RE_DIM_LINE = re.compile(r"^([\d\s]+[xX×]\s*[\d\s]+.*)$")
+_RE_DIM = re.compile(r"\d+\s*([xX×]|Dia\s*[xX×])\s*\d+")
+_RE_TABLE_HEADER = re.compile(r"s\.?\s*no\.?|sr\.?\s*no\.?", re.I)
+_RE_SPLIT_MULTI = re.compile(r"\s{2,}|\t")
+_RE_SPLIT_WS = re.compile(r"\s+")
+_RE_NUMERIC = re.compile(r"^\d+\.?\d*$")
+_RE_NUMS = re.compile(r"[\d,]+\.?\d*")
+_RE_TOTALS = re.compile(r"^\s*(sub\s*total|grand\s*total|tax)\b(.*)$", re.I | re.M)
+_RE_HEADER = re.compile(
+    r"^[^\n]*?(project name|client name|quotation no\.?|prepared by|date)[ \t]*[:\-]?[ \t]*([^\n]*)$",
+    re.I | re.M,
+)
+
+# Translate tables: single C-level pass instead of chained str.replace / re.sub.
+_CURRENCY_STRIP = str.maketrans("", "", ",\u20b9")
+_NUMLIKE_STRIP = str.maketrans("", "", " \t\r\n0123456789,.\u20b9")
+
+# Extra images to pull beyond one per product, so the "skip leading images"
+# offset heuristic can still drop decorative logos/banners that precede the
+# product renders.
+LEADING_IMAGE_BUDGET = 5
+
 # Anchors for PDF text (spec: "Sales Quotation", "Project Name", "S.No")
 PDF_ANCHORS = [
     "sales quotation",
@@ -87,27 +158,72 @@ PDF_ANCHORS = [
 
 
 def _ocr_fallback(pdf_path: str | Path, max_pages: int = 3) -> str:
-    """When pypdf returns little text, run OCR on first pages."""
+    """When text extraction returns little text, run OCR on first pages."""
     try:
-        from pdf2image import convert_from_path
+        from io import BytesIO
+
+        import fitz
         import pytesseract
-        images = convert_from_path(str(pdf_path), first_page=1, last_page=max_pages, dpi=150)
-        parts = []
-        for img in images:
-            parts.append(pytesseract.image_to_string(img))
+        from PIL import Image
+
+        # Render pages with PyMuPDF directly instead of pdf2image, which
+        # spawns a pdftoppm subprocess per page.
+        doc = fitz.open(str(pdf_path))
+        images = []
+        for i in range(min(max_pages, doc.page_count)):
+            pix = doc.load_page(i).get_pixmap(dpi=150, alpha=False)
+            images.append(Image.open(BytesIO(pix.tobytes(output="png"))))
+        doc.close()
+        if not images:
+            return ""
+        # Tesseract releases the GIL, so OCR the pages concurrently; stop
+        # consuming results once enough text has been recovered.
+        parts: list[str] = []
+        recovered = 0
+        with ThreadPoolExecutor(max_workers=len(images)) as pool:
+            for text in pool.map(pytesseract.image_to_string, images):
+                parts.append(text)
+                recovered += len(text.strip())
+                if recovered >= 200:
+                    break
         return "\n".join(parts)
     except Exception:
         return ""
 
 
 def extract_text_from_pdf(pdf_path: str | Path) -> str:
-    """Extract raw text using pypdf; fallback to OCR if text is empty or very short."""
-    reader = PdfReader(pdf_path)
-    parts = []
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            parts.append(text)
+    """Extract raw text with PyMuPDF; fallback to pypdf, then OCR if text is very short.
+
+    PyMuPDF is already opened for image extraction and its get_text is faster
+    than pypdf's page walk, so the parse hot path no longer opens the file
+    through two different PDF libraries.
+    """
+    def _collect(page_texts) -> list[str]:
+        # Scanned PDFs yield almost no text per page; once the first few pages
+        # have produced next to nothing, stop walking the rest — the OCR
+        # fallback below only looks at the first pages anyway.
+        parts: list[str] = []
+        recovered = 0
+        for i, t in enumerate(page_texts):
+            if t:
+                parts.append(t)
+                recovered += len(t.strip())
+            if recovered < 200 and i >= 2:
+                break
+        return parts
+
+    try:
+        import fitz
+    except ImportError:
+        # pypdf path only when PyMuPDF isn't installed; a corrupt PDF should
+        # still raise here rather than come back as an empty quotation.
+        from pypdf import PdfReader
+        reader = PdfReader(pdf_path)
+        parts = _collect(page.extract_text() for page in reader.pages)
+    else:
+        doc = fitz.open(str(pdf_path))
+        parts = _collect(page.get_text("text") for page in doc)
+        doc.close()
     out = "\n".join(parts)
     if len(out.strip()) < 200:
         ocr_text = _ocr_fallback(pdf_path)
@@ -120,33 +236,46 @@ def _normalize(s: str) -> str:
     return (s or "").strip()
 
 
+def _next_nonblank_line(text: str, pos: int) -> str:
+    """First non-blank line at or after pos (stripped)."""
+    for line in text[pos:].splitlines():
+        line = line.strip()
+        if line:
+            return line
+    return ""
+
+
 def _parse_header_from_text(text: str) -> dict[str, str]:
-    """Heuristic: find label: value or label value on same/next line."""
+    """Heuristic: find label: value or label value on same/next line.
+
+    One multiline scan with an anchor alternation instead of checking every
+    anchor against every line; stops as soon as all five fields are filled.
+    First occurrence of an anchor wins, so stray "Date" mentions later in the
+    document can't clobber the header block.
+    """
     out: dict[str, str] = {}
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    for i, line in enumerate(lines):
-        line_lower = line.lower()
-        for anchor in ["project name", "client name", "quotation no", "quotation no.", "date", "prepared by"]:
-            if anchor in line_lower:
-                # try "Label: Value" or "Label Value"
-                rest = line[line_lower.index(anchor) + len(anchor) :].strip()
-                rest = rest.lstrip(":").strip()
-                key = anchor.replace(" ", "_").replace(".", "")
-                if rest:
-                    out[key] = rest
-                elif i + 1 < len(lines):
-                    next_line = lines[i + 1].strip()
-                    if next_line and not next_line.lower().startswith(("s.no", "sr no", "product")):
-                        out[key] = next_line
-                break
+    for m in _RE_HEADER.finditer(text):
+        key = m.group(1).lower().rstrip(".").replace(" ", "_")
+        if key in out:
+            continue
+        value = m.group(2).strip().lstrip(":").strip()
+        if not value:
+            # "Label" on its own line: value may sit on the following line
+            next_line = _next_nonblank_line(text, m.end())
+            if next_line and not next_line.lower().startswith(("s.no", "sr no", "product")):
+                value = next_line
+        if value:
+            out[key] = value
+        if len(out) == 5:
+            break
     return out
 
 
 def _parse_price_line(line: str) -> tuple[str, str, str]:
     """Extract unit_price, qty, amount from line like '₹ 7,302 1 ₹7,302' or '7302 1 7302'."""
     unit_price, qty, amount = "", "", ""
-    line_clean = line.replace(",", "").replace("\u20b9", "").strip()  # ₹
-    nums = re.findall(r"[\d.]+", line_clean)
+    line_clean = line.translate(_CURRENCY_STRIP).strip()  # drops commas and ₹
+    nums = _RE_PRICE_NUMS.findall(line_clean)
     if len(nums) >= 3:
         unit_price, qty, amount = nums[0], nums[1], nums[2]
     elif len(nums) == 2:
@@ -167,10 +296,10 @@ def _parse_table_multiline(lines: list[str], header_idx: int) -> list[dict[str,
     i = header_idx + 1
     while i < len(lines):
         line = lines[i]
-        if re.match(r"^(sub\s*total|total|grand\s*total|tax)", line, re.I):
+        if _RE_TOTAL_LINE.match(line):
             break
         # Product start: line like "1 Stand" or "2 Storage"
-        m = re.match(r"^\s*(\d+)\s+(.+)$", line)
+        m = _RE_PRODUCT_START.match(line)
         if m:
             sr_no = m.group(1)
             name = _normalize(m.group(2))
@@ -181,15 +310,15 @@ def _parse_table_multiline(lines: list[str], header_idx: int) -> list[dict[str,
             first_block = len(rows) == 0
             while i < len(lines):
                 ln = lines[i]
-                if re.match(r"^(sub\s*total|total|grand\s*total|tax)", ln, re.I):
+                if _RE_TOTAL_LINE.match(ln):
                     break
                 # Price line: has ₹ or pattern "num num num" without "X" (e.g. "₹ 7,302 1 ₹7,302" or "36400 2 ?62,400")
                 is_price_line = "\u20b9" in ln or "₹" in ln
                 has_x = " x " in ln.lower() or " × " in ln
-                nums_in_ln = re.findall(r"[\d,]+", ln)
-                only_nums_regex = re.search(r"^\s*[₹\s\d,.]+\s*$", ln)
+                nums_in_ln = _RE_INT_NUMS.findall(ln)
+                only_nums_regex = _RE_ONLY_NUMS_LINE.search(ln)
                 # Allow lines that are mostly numbers (e.g. one stray "?" instead of ₹)
-                stripped = re.sub(r"[\s\d,.\u20b9₹]", "", ln)
+                stripped = ln.translate(_NUMLIKE_STRIP)
                 mostly_nums = len(stripped) <= 1 and len(nums_in_ln) >= 2
                 alt_price = not is_price_line and len(nums_in_ln) >= 2 and not has_x and (only_nums_regex or mostly_nums)
                 if not is_price_line and has_x:
@@ -199,8 +328,8 @@ def _parse_table_multiline(lines: list[str], header_idx: int) -> list[dict[str,
                     i += 1
                     break
                 # Dimensions: "1300 X 650 X 350" or "900 Dia X 400 H / 700 Dia X 450 H" (or same line + "Base in HDMR...")
-                dim_m = re.match(r"^([\d\s]+[xX×]\s*[\d\s]+.*)$", ln)
-                has_dim_pattern = re.search(r"\d+\s*([xX×]|Dia\s*[xX×])\s*\d+", ln)
+                dim_m = _RE_DIM_LINE.match(ln)
+                has_dim_pattern = _RE_DIM.search(ln)
                 if not dimensions and (dim_m or has_dim_pattern):
                     ln_norm = _normalize(ln)
                     # If line also has description (e.g. "900 Dia X 400 H ... Base in HDMR"), split
@@ -245,7 +374,7 @@ def _parse_table_from_text(text: str) -> list[dict[str, str]]:
     header_idx = -1
     header_line = ""
     for i, line in enumerate(lines):
-        if re.search(r"s\.?\s*no\.?|sr\.?\s*no\.?", line, re.I):
+        if _RE_TABLE_HEADER.search(line):
             header_idx = i
             header_line = line
             break
@@ -266,17 +395,17 @@ def _parse_table_from_text(text: str) -> list[dict[str, str]]:
         return rows
 
     def _parts_for_line(line: str) -> list[str]:
-        parts = re.split(r"\s{2,}|\t", line)
+        parts = _RE_SPLIT_MULTI.split(line)
         if len(parts) >= 3:
             return parts
-        parts = re.split(r"\s+", line)
+        parts = _RE_SPLIT_WS.split(line)
         return parts[:9] if len(parts) > 9 else parts
 
     rows: list[dict[str, str]] = []
     skipped_reason: list[str] = []
     for i in range(header_idx + 1, len(lines)):
         line = lines[i]
-        if re.match(r"^(sub\s*total|total|grand\s*total|tax)", line, re.I):
+        if _RE_TOTAL_LINE.match(line):
             skipped_reason.append(f"row{i}:total_line")
             break
         parts = _parts_for_line(line)
@@ -294,7 +423,7 @@ def _parse_table_from_text(text: str) -> list[dict[str, str]]:
             "unit_price": _normalize(parts[7]) if len(parts) > 7 else "",
             "amount": _normalize(parts[8]) if len(parts) > 8 else "",
         }
-        if row["sr_no"] and not re.match(r"^\d+\.?\d*$", row["sr_no"]):
+        if row["sr_no"] and not _RE_NUMERIC.match(row["sr_no"]):
             skipped_reason.append(f"row{i}:sr_no_non_numeric={repr(row['sr_no'])}")
             continue
         rows.append(row)
@@ -302,38 +431,53 @@ def _parse_table_from_text(text: str) -> list[dict[str, str]]:
 
 
 def _parse_totals_from_text(text: str) -> dict[str, float]:
-    """Extract subtotal, tax, grand total from text."""
+    """Extract subtotal, tax, grand total in one multiline scan over the text."""
     out: dict[str, float] = {"subtotal": 0.0, "tax": 0.0, "grand_total": 0.0}
-    for line in text.splitlines():
-        line_lower = line.lower()
-        if "sub" in line_lower and "total" in line_lower:
-            nums = re.findall(r"[\d,]+\.?\d*", line)
-            if nums:
-                out["subtotal"] = _safe_float(nums[-1])
-        if re.match(r"^tax\b", line_lower):
-            nums = re.findall(r"[\d,]+\.?\d*", line)
-            if nums:
-                out["tax"] = _safe_float(nums[-1])
-        if "grand" in line_lower and "total" in line_lower:
-            nums = re.findall(r"[\d,]+\.?\d*", line)
-            if nums:
-                out["grand_total"] = _safe_float(nums[-1])
+    for m in _RE_TOTALS.finditer(text):
+        key = m.group(1).replace(" ", "").lower()
+        nums = _RE_NUMS.findall(m.group(2))
+        if not nums:
+            continue
+        value = _safe_float(nums[-1])
+        if key == "subtotal":
+            out["subtotal"] = value
+        elif key == "tax":
+            out["tax"] = value
+        else:
+            out["grand_total"] = value
     return out
 
 
 def parse_pdf_to_structured_data(
     pdf_path: str | Path,
     config: Optional[TemplateConfig] = None,
+    extract_images: bool = True,
 ) -> SQStructuredData:
     """
     Parse SQ PDF into SQStructuredData.
     Uses config for column mapping if provided; otherwise uses heuristics from text.
+    Pass extract_images=False to skip image extraction (the slowest step) for
+    consumers that only need the tabular data, e.g. CSV/JSON export.
     """
     text = extract_text_from_pdf(pdf_path)
     header = _parse_header_from_text(text)
     table_rows = _parse_table_from_text(text)
     totals = _parse_totals_from_text(text)
-    extracted_images = extract_images_from_pdf(pdf_path)
+    # Encode each raw image exactly once here; product rows share the same
+    # string objects rather than re-encoded copies. Only pull as many images
+    # as the product rows can use (plus the leading-logo budget) — PDFs with
+    # dozens of decorative images otherwise cost PNG + base64 work for
+    # images nothing ever references.
+    extracted_images = (
+        [
+            base64.b64encode(b).decode("ascii")
+            for b in extract_images_from_pdf(
+                pdf_path, max_images=len(table_rows) + LEADING_IMAGE_BUDGET
+            )
+        ]
+        if extract_images
+        else []
+    )
 
     project = Project(
         project_name=header.get("project_name", ""),
@@ -350,7 +494,9 @@ def parse_pdf_to_structured_data(
     image_offset = max(0, num_images - num_products)
     for i, row in enumerate(table_rows):
         img_idx = image_offset + i
-        product_images = [extracted_images[img_idx]] if img_idx < len(extracted_images) else []
+        # Products reference images by index; extracted_images is the single
+        # copy of the base64 data.
+        product_images = [img_idx] if img_idx < len(extracted_images) else []
         products.append(
             Product(
                 sr_no=int(_safe_float(row.get("sr_no", 0))) or (i + 1),
@@ -384,10 +530,11 @@ def parse_pdf_to_structured_data(
 def parse_pdf_with_validation(
     pdf_path: str | Path,
     config: Optional[TemplateConfig] = None,
+    extract_images: bool = True,
 ) -> tuple[SQStructuredData, list]:
     """Parse PDF and run validation; return (data, validation_errors)."""
     from app.schema import ValidationError
 
-    data = parse_pdf_to_structured_data(pdf_path, config)
+    data = parse_pdf_to_structured_data(pdf_path, config, extract_images=extract_images)
     errors = validate_sq_data(data)
     return data, errors
@@ -2,34 +2,66 @@
 Phase 3: Auto PPT Generator (spec §9).
 Slides: Project Summary → Product Overview → Product Renders → Technical Drawings → Lifecycle → Delivery.
 """
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from io import BytesIO
+from typing import BinaryIO
+
+try:
+    import pybase64 as base64  # SIMD base64; ~7-10x faster on large payloads
+except ImportError:
+    import base64
+
+from copy import deepcopy
+
+from lxml import etree
 from pptx import Presentation
+from pptx.oxml.ns import qn
 from pptx.util import Inches, Pt
 
 from app.schema import SQStructuredData
 
+# Prebuilt 14pt bullet paragraph, cloned per line in _add_content_slide.
+# Appending ready-made <a:p> elements skips python-pptx's add_paragraph /
+# font.size property setters, which re-walk the rPr tree per call.
+_BULLET_P = etree.fromstring(
+    '<a:p xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+    '<a:r><a:rPr lang="en-US" sz="1400" dirty="0"/><a:t/></a:r></a:p>'
+)
+_QN_P = qn("a:p")
+_QN_R = qn("a:r")
+_QN_T = qn("a:t")
+
 
-def _add_title_slide(prs: Presentation, title: str, subtitle: str = "") -> None:
-    slide = prs.slides.add_slide(prs.slide_layouts[0])
+@lru_cache(maxsize=256)
+def _decode_b64(s: str) -> bytes:
+    """Cached base64 decode; the same product images recur when decks are regenerated."""
+    return base64.b64decode(s)
+
+
+def _add_title_slide(prs: Presentation, layout, title: str, subtitle: str = "") -> None:
+    slide = prs.slides.add_slide(layout)
     slide.shapes.title.text = title
     if subtitle and slide.placeholders[1]:
         slide.placeholders[1].text = subtitle
 
 
-def _add_content_slide(prs: Presentation, title: str, bullets: list[str]) -> None:
-    slide = prs.slides.add_slide(prs.slide_layouts[1])
+def _add_content_slide(prs: Presentation, layout, title: str, bullets: list[str]) -> None:
+    slide = prs.slides.add_slide(layout)
     slide.shapes.title.text = title
     body = slide.placeholders[1].text_frame
-    body.clear()
-    for i, line in enumerate(bullets):
-        p = body.add_paragraph() if i else body.paragraphs[0]
-        p.text = line
-        p.level = 0
-        p.font.size = Pt(14)
+    tx_body = body._txBody
+    for p in tx_body.findall(_QN_P):  # drop the layout's placeholder paragraphs
+        tx_body.remove(p)
+    for line in bullets:
+        p = deepcopy(_BULLET_P)
+        p.find(_QN_R).find(_QN_T).text = line
+        tx_body.append(p)
 
 
-def _add_product_slide(prs: Presentation, product, index: int, total: int) -> None:
-    slide = prs.slides.add_slide(prs.slide_layouts[6])  # blank
+def _add_product_slide(prs: Presentation, layout, product, index: int, total: int, extracted_images: list[str]) -> None:
+    slide = prs.slides.add_slide(layout)  # blank
     left = Inches(0.5)
     top = Inches(0.5)
     w, h = Inches(9), Inches(1)
@@ -44,7 +76,8 @@ def _add_product_slide(prs: Presentation, product, index: int, total: int) -> No
     tf2 = tb2.text_frame
     tf2.word_wrap = True
     p0 = tf2.paragraphs[0]
-    p0.text = (product.description or "")[:300] + ("…" if len(product.description or "") > 300 else "")
+    desc = product.description or ""
+    p0.text = desc[:300] + ("…" if len(desc) > 300 else "")
     p0.font.size = Pt(12)
     if product.dimensions:
         p2 = tf2.add_paragraph()
@@ -54,11 +87,12 @@ def _add_product_slide(prs: Presentation, product, index: int, total: int) -> No
     p3.text = f"Qty: {product.qty}  |  Rate: ₹{product.unit_price:,.0f}  |  Amount: ₹{product.amount:,.0f}"
     p3.font.size = Pt(11)
     # Optional: add first product image if base64 available
-    if product.images:
+    if product.images and 0 <= product.images[0] < len(extracted_images):
         try:
-            import base64
-            from pptx.util import Emu
-            img_data = base64.b64decode(product.images[0])
+            img_data = _decode_b64(extracted_images[product.images[0]])
+            # Fresh BytesIO per image on purpose: BytesIO(initial_bytes) is
+            # copy-on-write in CPython, whereas reusing one buffer via
+            # seek/truncate/write would copy the image bytes every time.
             pic = slide.shapes.add_picture(
                 BytesIO(img_data), Inches(0.5), Inches(2.8), width=Inches(2.5)
             )
@@ -66,16 +100,28 @@ def _add_product_slide(prs: Presentation, product, index: int, total: int) -> No
             pass
 
 
-def generate_ppt(data: SQStructuredData) -> bytes:
-    """Generate PowerPoint from SQ structured data. Returns .pptx file bytes."""
+def generate_ppt(data: SQStructuredData, out: BinaryIO | None = None) -> bytes | None:
+    """Generate PowerPoint from SQ structured data.
+
+    When out (a writable binary stream or path) is given, the deck is saved
+    straight to it and None is returned — no intermediate buffer, so peak
+    memory stays at one copy of the deck. Otherwise returns .pptx bytes.
+    """
     prs = Presentation()
     prs.slide_width = Inches(10)
     prs.slide_height = Inches(7.5)
 
+    # Layouts are looked up once; each slide_layouts[i] access walks layout
+    # XML inside python-pptx, which adds up over per-product slides.
+    title_layout = prs.slide_layouts[0]
+    content_layout = prs.slide_layouts[1]
+    blank_layout = prs.slide_layouts[6]
+
     proj = data.project
     # 1. Project Summary
     _add_title_slide(
         prs,
+        title_layout,
         "Project Summary",
         f"{proj.project_name or 'SQ'}  |  Client: {proj.client_name or '—'}  |  Date: {proj.date or '—'}"
     )
@@ -83,21 +129,38 @@ def generate_ppt(data: SQStructuredData) -> bytes:
     bullets = [f"{p.sr_no}. {p.name} – Qty {p.qty}, ₹{p.amount:,.0f}" for p in data.products[:15]]
     if len(data.products) > 15:
         bullets.append(f"... and {len(data.products) - 15} more")
-    _add_content_slide(prs, "Product Overview", bullets or ["No products"])
+    _add_content_slide(prs, content_layout, "Product Overview", bullets or ["No products"])
     # 3. Product Render Slides
+    # Slide insertion mutates shared package state, so it stays serial; the
+    # per-product image decodes are independent though, so for big decks they
+    # are done up front in a thread pool (pre-warming the _decode_b64 cache).
+    extracted_images = data.extracted_images
+    if len(data.products) >= 20:
+        first_images = {
+            extracted_images[p.images[0]]
+            for p in data.products
+            if p.images and 0 <= p.images[0] < len(extracted_images)
+        }
+        if first_images:
+            with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+                for _ in pool.map(_decode_b64, first_images):
+                    pass
+    total = len(data.products)
     for i, p in enumerate(data.products):
-        _add_product_slide(prs, p, i, len(data.products))
+        _add_product_slide(prs, blank_layout, p, i, total, extracted_images)
     # 4. Technical Drawings (placeholder)
-    _add_content_slide(prs, "Technical Drawings", ["Per product drawings (Phase 2 output)."])
+    _add_content_slide(prs, content_layout, "Technical Drawings", ["Per product drawings (Phase 2 output)."])
     # 5. Manufacturing Lifecycle (placeholder)
-    _add_content_slide(prs, "Manufacturing Lifecycle", [
+    _add_content_slide(prs, content_layout, "Manufacturing Lifecycle", [
         "Machining → Carpentry → Metal → Assembly → Upholstery → Paint → Final Assembly → Packaging → Dispatch",
         "(See SOW for per-product stages.)",
     ])
     # 6. Delivery Timeline (placeholder)
-    _add_content_slide(prs, "Delivery Timeline", ["TBD – link to Gantt (Phase 4)."])
+    _add_content_slide(prs, content_layout, "Delivery Timeline", ["TBD – link to Gantt (Phase 4)."])
 
+    if out is not None:
+        prs.save(out)
+        return None
     buf = BytesIO()
     prs.save(buf)
-    buf.seek(0)
-    return buf.read()
+    return buf.getvalue()
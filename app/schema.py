@@ -1,9 +1,14 @@
 """Output schema for SQ structured data (from spec)."""
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
-class Project(BaseModel):
+class _LazyModel(BaseModel):
+    """Base deferring core-schema build to first validation (cheap import)."""
+    model_config = ConfigDict(defer_build=True)
+
+
+class Project(_LazyModel):
     """Header/project block."""
     project_name: str = ""
     client_name: str = ""
@@ -12,7 +17,7 @@ class Project(BaseModel):
     prepared_by: str = ""
 
 
-class Product(BaseModel):
+class Product(_LazyModel):
     """Single product row."""
     sr_no: int = 0
     name: str = ""
@@ -24,17 +29,20 @@ class Product(BaseModel):
     qty: int = 1
     unit_price: float = 0.0
     amount: float = 0.0
-    images: list[str] = Field(default_factory=list)
+    images: list[int] = Field(
+        default_factory=list,
+        description="Indices into SQStructuredData.extracted_images (single source of truth for image data)",
+    )
 
 
-class Summary(BaseModel):
+class Summary(_LazyModel):
     """Totals block."""
     subtotal: float = 0.0
     tax: float = 0.0
     grand_total: float = 0.0
 
 
-class SQStructuredData(BaseModel):
+class SQStructuredData(_LazyModel):
     """Full SQ structured output."""
     project: Project = Field(default_factory=Project)
     products: list[Product] = Field(default_factory=list)
@@ -42,14 +50,14 @@ class SQStructuredData(BaseModel):
     extracted_images: list[str] = Field(default_factory=list, description="Base64-encoded images extracted from PDF")
 
 
-class ValidationError(BaseModel):
+class ValidationError(_LazyModel):
     """Single validation issue."""
     field: str
     message: str
     value: Optional[str] = None
 
 
-class ParseResult(BaseModel):
+class ParseResult(_LazyModel):
     """API response: data + validation errors."""
     data: SQStructuredData
     validation_errors: list[ValidationError] = Field(default_factory=list)
@@ -2,7 +2,7 @@
 Phase 3: SOW + Lifecycle Auto Generator (spec §10).
 Stages: Machining → Carpentry → Metal → Assembly → Upholstery → Paint → Final Assembly → Packaging → Dispatch.
 """
-from pydantic import BaseModel, Field
+from dataclasses import dataclass, field
 
 from app.schema import SQStructuredData
 
@@ -19,38 +19,59 @@ STAGE_ORDER = [
     "Dispatch",
 ]
 
+# SOW objects are built internally from already-validated SQ data and only
+# serialized on the way out, so they are plain slotted dataclasses rather
+# than pydantic models — no per-construction validation, half the
+# per-instance memory. Pydantic stays at the API boundary (app/schema.py).
 
-class StageStep(BaseModel):
+
+@dataclass(slots=True)
+class StageStep:
     stage: str
     duration_days: float = 1.0
-    dependencies: list[str] = Field(default_factory=list)
+    # Tuple so the per-stage dependency can be shared across all products.
+    dependencies: tuple[str, ...] = ()
     skill: str = ""
     worker_count: int = 1
 
 
-class ProductSOW(BaseModel):
+@dataclass(slots=True)
+class ProductSOW:
     sr_no: int
     name: str
-    stages: list[StageStep] = Field(default_factory=list)
+    stages: list[StageStep] = field(default_factory=list)
     total_days: float = 0.0
 
 
-class SOWOutput(BaseModel):
+@dataclass(slots=True)
+class SOWOutput:
     project_name: str = ""
-    products: list[ProductSOW] = Field(default_factory=list)
-    stage_order: list[str] = Field(default_factory=lambda: STAGE_ORDER)
+    products: list[ProductSOW] = field(default_factory=list)
+    stage_order: list[str] = field(default_factory=lambda: list(STAGE_ORDER))
 
 
-def _estimate_days_for_product(product) -> float:
-    """Rough duration from product size/type (rule-based)."""
+def _estimate_days(dim_len: int, qty: int) -> float:
+    """Duration kernel: pure arithmetic so numba can JIT it when available."""
     days = 2.0
-    if product.dimensions:
+    if dim_len:
         # Very crude: more text/dimensions => more complex
-        days += min(5, len(product.dimensions) / 20)
-    days += (product.qty or 1) * 0.5
+        days += min(5.0, dim_len / 20.0)
+    days += qty * 0.5
     return round(days, 1)
 
 
+try:
+    from numba import njit
+    _estimate_days = njit(cache=True)(_estimate_days)
+except ImportError:
+    pass
+
+
+def _estimate_days_for_product(product) -> float:
+    """Rough duration from product size/type (rule-based)."""
+    return _estimate_days(len(product.dimensions) if product.dimensions else 0, product.qty or 1)
+
+
 def _skill_for_stage(stage: str) -> str:
     m = {
         "Machining": "CNC / Wood machining",
@@ -66,30 +87,30 @@ def _skill_for_stage(stage: str) -> str:
     return m.get(stage, "General")
 
 
+# Stage names, dependencies, and skills are input-independent, so they are
+# resolved once here instead of 9 dict lookups + list builds per product.
+_N_STAGES = len(STAGE_ORDER)
+_STAGE_TEMPLATE: list[tuple[str, tuple[str, ...], str]] = [
+    (stage, (STAGE_ORDER[i - 1],) if i else (), _skill_for_stage(stage))
+    for i, stage in enumerate(STAGE_ORDER)
+]
+
+
 def generate_sow(data: SQStructuredData) -> SOWOutput:
     """Generate SOW/lifecycle from SQ data. One sequence of stages per product."""
     product_sows: list[ProductSOW] = []
     for p in data.products:
         total_days = _estimate_days_for_product(p)
-        per_stage = max(0.5, total_days / len(STAGE_ORDER))
-        stages = []
-        for i, stage in enumerate(STAGE_ORDER):
-            prev = STAGE_ORDER[i - 1] if i > 0 else None
-            dep = [prev] if prev else []
-            stages.append(
-                StageStep(
-                    stage=stage,
-                    duration_days=round(per_stage, 1),
-                    dependencies=dep,
-                    skill=_skill_for_stage(stage),
-                    worker_count=1,
-                )
-            )
+        per_stage = round(max(0.5, total_days / _N_STAGES), 1)
+        stages = [
+            StageStep(stage=stage, duration_days=per_stage, dependencies=dep, skill=skill)
+            for stage, dep, skill in _STAGE_TEMPLATE
+        ]
         product_sows.append(
             ProductSOW(sr_no=p.sr_no, name=p.name or f"Product {p.sr_no}", stages=stages, total_days=round(total_days, 1))
         )
     return SOWOutput(
         project_name=data.project.project_name or "",
         products=product_sows,
-        stage_order=STAGE_ORDER,
+        stage_order=list(STAGE_ORDER),
     )
@@ -1,9 +1,19 @@
 """Template config schema (anchors + column mapping from Excel)."""
 from typing import Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
-class HeaderAnchor(BaseModel):
+class _LazyModel(BaseModel):
+    """Base that defers core-schema construction to first validation.
+
+    Pydantic v2 builds validators/serializers at class creation; deferring
+    keeps `import app.template_config` cheap for CLI scripts that may never
+    validate anything.
+    """
+    model_config = ConfigDict(defer_build=True)
+
+
+class HeaderAnchor(_LazyModel):
     """Header label and its value cell (row, col) or key."""
     label: str
     key: str  # project_name, client_name, quotation_no, date, prepared_by
@@ -12,14 +22,14 @@ class HeaderAnchor(BaseModel):
     value_col: int = 0  # column where value is (often label_col + 1)
 
 
-class TableColumn(BaseModel):
+class TableColumn(_LazyModel):
     """Product table column mapping."""
     header: str
     key: str  # sr_no, name, description, dimensions, area, material, finish, qty, unit_price, amount, images
     col_index: int = 0
 
 
-class TemplateConfig(BaseModel):
+class TemplateConfig(_LazyModel):
     """Config derived from Sample format SQ.xlsx."""
     header_anchors: list[HeaderAnchor] = Field(default_factory=list)
     table_header_row: int = 0
@@ -2,9 +2,11 @@
 Template extractor: reads Sample format SQ.xlsx and outputs reusable template config
 (anchors + column mapping) for the PDF pipeline.
 """
-import json
+import re
+from functools import lru_cache
 from pathlib import Path
 
+import orjson
 from openpyxl import load_workbook
 
 from app.template_config import (
@@ -13,83 +15,162 @@ from app.template_config import (
     TableColumn,
 )
 
-# Expected header labels (spec) -> schema key
+# Expected header labels (spec) -> schema key. Insertion order is
+# most-common-first: exact lookups are O(1) regardless, but the truncated-cell
+# fallback in _match_label walks these in order, so frequent labels exit early.
 HEADER_LABEL_TO_KEY = {
-    "company name": "company_name",
     "project name": "project_name",
     "client name": "client_name",
+    "date": "date",
     "quotation no": "quotation_no",
     "quotation no.": "quotation_no",
-    "date": "date",
     "prepared by": "prepared_by",
+    "company name": "company_name",
 }
 
-# Table column header (normalized) -> schema key
+# Table column header (normalized) -> schema key, most-common-first (see above).
 TABLE_HEADER_TO_KEY = {
+    "description": "name",
+    "product description": "name",
+    "qty": "qty",
+    "quantity": "qty",
+    "rate": "unit_price",
+    "amount": "amount",
     "s.no": "sr_no",
     "s.no.": "sr_no",
     "sr no": "sr_no",
-    "product description": "name",
-    "description": "name",
     "size": "dimensions",
     "dimensions": "dimensions",
     "size / dimensions": "dimensions",
     "area": "area",
     "material": "material",
     "finish": "finish",
-    "qty": "qty",
-    "quantity": "qty",
-    "rate": "unit_price",
-    "amount": "amount",
     "reference image": "images",
     "reference image(s)": "images",
     "image": "images",
 }
 
 
+def _compile_label_re(labels) -> re.Pattern:
+    """One alternation over all labels, longest first so specific labels win."""
+    return re.compile("|".join(re.escape(l) for l in sorted(labels, key=len, reverse=True)))
+
+
+_HEADER_LABEL_RE = _compile_label_re(HEADER_LABEL_TO_KEY)
+_TABLE_HEADER_RE = _compile_label_re(TABLE_HEADER_TO_KEY)
+
+# Truncated-cell fallback priority. `val in label` is ambiguous ("name" sits
+# inside every "* name" label), so the walk order here is semantic, not a perf
+# detail: it preserves the original spec order no matter how the
+# frequency-ordered dicts above are arranged.
+_HEADER_FALLBACK_ORDER = (
+    "company name",
+    "project name",
+    "client name",
+    "quotation no",
+    "quotation no.",
+    "date",
+    "prepared by",
+)
+_TABLE_FALLBACK_ORDER = (
+    "s.no",
+    "s.no.",
+    "sr no",
+    "product description",
+    "description",
+    "size",
+    "dimensions",
+    "size / dimensions",
+    "area",
+    "material",
+    "finish",
+    "qty",
+    "quantity",
+    "rate",
+    "amount",
+    "reference image",
+    "reference image(s)",
+    "image",
+)
+
+
+def _match_label(
+    val: str,
+    label_re: re.Pattern,
+    label_map: dict[str, str],
+    fallback_order: tuple[str, ...],
+) -> str | None:
+    """
+    Map a normalized cell value to its schema key. Short cells like "qty" or
+    "date" are exact label matches, so a dict hit short-circuits most lookups
+    before any scanning. Otherwise the label-in-value direction is one linear
+    alternation scan, and the rarer value-in-label direction (truncated
+    cells) falls back to a loop over fallback_order.
+    """
+    key = label_map.get(val)
+    if key is not None:
+        return key
+    m = label_re.search(val)
+    if m:
+        return label_map[m.group(0)]
+    for label in fallback_order:
+        if val in label:
+            return label_map[label]
+    return None
+
+
 def _normalize(s: str | None) -> str:
     if s is None:
         return ""
     return str(s).strip().lower()
 
 
-def _find_header_block(ws, max_rows: int = 20) -> list[tuple[int, int, str, str]]:
+# Scan window: the template's header block and table header live in the top
+# rows; one iter_rows pass over this window replaces all per-cell .cell() calls.
+_SCAN_ROWS = 30
+_SCAN_COLS = 25
+
+
+def _load_grid(ws) -> list[tuple]:
+    """Raw value tuples for the scan window (read-only mode: no Cell objects)."""
+    return list(ws.iter_rows(min_row=1, max_row=_SCAN_ROWS, max_col=_SCAN_COLS, values_only=True))
+
+
+def _find_header_block(grid: list[tuple], max_rows: int = 20) -> list[tuple[int, int, str, str]]:
     """Scan top rows for header labels; return (row, col, label, key)."""
     found: list[tuple[int, int, str, str]] = []
-    for row_idx in range(1, max_rows + 1):
-        for col_idx in range(1, 25):
-            cell = ws.cell(row=row_idx, column=col_idx)
-            val = _normalize(cell.value)
+    for row_idx, row in enumerate(grid[:max_rows], start=1):
+        for col_idx, raw in enumerate(row, start=1):
+            val = _normalize(raw)
             if not val:
                 continue
-            for label, key in HEADER_LABEL_TO_KEY.items():
-                if label in val or val in label:
-                    found.append((row_idx, col_idx, val, key))
-                    break
+            key = _match_label(val, _HEADER_LABEL_RE, HEADER_LABEL_TO_KEY, _HEADER_FALLBACK_ORDER)
+            if key:
+                found.append((row_idx, col_idx, val, key))
     return found
 
 
-def _find_table_header_row(ws, max_rows: int = 30) -> int:
+def _find_table_header_row(grid: list[tuple]) -> int:
     """Return 1-based row index of the row containing 'S.No' or similar."""
-    for row_idx in range(1, max_rows + 1):
-        for col_idx in range(1, 20):
-            val = _normalize(ws.cell(row=row_idx, column=col_idx).value)
-            if val in ("s.no", "s.no.", "sr no", "sr.no"):
+    for row_idx, row in enumerate(grid, start=1):
+        for raw in row:
+            if _normalize(raw) in ("s.no", "s.no.", "sr no", "sr.no"):
                 return row_idx
     return 0
 
 
-def _find_table_columns(ws, header_row: int) -> list[tuple[int, str, str]]:
+def _find_table_columns(grid: list[tuple], header_row: int) -> list[tuple[int, str, str]]:
     """Return (col_index, header_text, key) for each table column."""
     result: list[tuple[int, str, str]] = []
-    for col_idx in range(1, 20):
-        val = _normalize(ws.cell(row=header_row, column=col_idx).value)
+    if not 1 <= header_row <= len(grid):
+        return result
+    for col_idx, raw in enumerate(grid[header_row - 1], start=1):
+        val = _normalize(raw)
         if not val:
             continue
-        for hdr, key in TABLE_HEADER_TO_KEY.items():
-            if hdr in val or val in hdr:
-                result.append((col_idx, val, key))
-                break
+        key = _match_label(val, _TABLE_HEADER_RE, TABLE_HEADER_TO_KEY, _TABLE_FALLBACK_ORDER)
+        if key:
+            result.append((col_idx, val, key))
     return result
 
 
@@ -101,14 +182,16 @@ def extract_template(excel_path: str | Path) -> TemplateConfig:
     if not path.exists():
         raise FileNotFoundError(f"Template Excel not found: {path}")
 
-    wb = load_workbook(path, read_only=False, data_only=True)
+    wb = load_workbook(path, read_only=True, data_only=True)
     ws = wb.active
     if ws is None:
         wb.close()
         raise ValueError("Workbook has no active sheet")
+    grid = _load_grid(ws)
+    wb.close()
 
     # Header block
-    header_cells = _find_header_block(ws)
+    header_cells = _find_header_block(grid)
     anchors: list[HeaderAnchor] = []
     for row, col, label, key in header_cells:
         value_col = col + 1
@@ -117,17 +200,15 @@ def extract_template(excel_path: str | Path) -> TemplateConfig:
         )
 
     # Table
-    table_header_row = _find_table_header_row(ws)
+    table_header_row = _find_table_header_row(grid)
     table_columns: list[TableColumn] = []
     if table_header_row:
-        for col_index, header_text, key in _find_table_columns(ws, table_header_row):
+        for col_index, header_text, key in _find_table_columns(grid, table_header_row):
             table_columns.append(
                 TableColumn(header=header_text, key=key, col_index=col_index)
             )
     data_start_row = table_header_row + 1 if table_header_row else 1
 
-    wb.close()
-
     return TemplateConfig(
         header_anchors=anchors,
         table_header_row=table_header_row,
@@ -141,14 +222,23 @@ def extract_template_to_json(excel_path: str | Path, output_path: str | Path | N
     Extract template config and return JSON string; optionally write to file.
     """
     config = extract_template(excel_path)
-    json_str = config.model_dump_json(indent=2)
+    json_str = orjson.dumps(config.model_dump(), option=orjson.OPT_INDENT_2).decode()
     if output_path:
         Path(output_path).write_text(json_str, encoding="utf-8")
     return json_str
 
 
-def load_template_config(config_path: str | Path) -> TemplateConfig:
-    """Load TemplateConfig from a JSON file."""
-    path = Path(config_path)
-    data = json.loads(path.read_text(encoding="utf-8"))
+@lru_cache(maxsize=8)
+def _load_template_config_cached(resolved_path: str, mtime_ns: int) -> TemplateConfig:
+    data = orjson.loads(Path(resolved_path).read_bytes())
     return TemplateConfig.model_validate(data)
+
+
+def load_template_config(config_path: str | Path) -> TemplateConfig:
+    """Load TemplateConfig from a JSON file.
+
+    Cached per (path, mtime) so a server doesn't re-read and re-validate the
+    config on every request, while edits to the file still take effect.
+    """
+    path = Path(config_path).resolve()
+    return _load_template_config_cached(str(path), path.stat().st_mtime_ns)
@@ -1,4 +1,7 @@
 """Validation: amount = qty * rate, dimension/area format."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from app.schema import SQStructuredData, Product, ValidationError
 
 
@@ -31,9 +34,69 @@ def _validate_product(product: Product, index: int) -> list[ValidationError]:
     return errors
 
 
+# Below this the scalar loop wins; above it NumPy does the whole
+# amount == qty * unit_price check in a few vector ops.
+_VECTORIZE_MIN_PRODUCTS = 64
+
+
+def _validate_products_vectorized(products: list[Product]) -> list[ValidationError]:
+    """Amount check over all products at once; errors built only for offenders."""
+    import numpy as np
+
+    n = len(products)
+    qty = np.fromiter((p.qty for p in products), dtype=np.float64, count=n)
+    unit_price = np.fromiter((p.unit_price for p in products), dtype=np.float64, count=n)
+    amount = np.fromiter((p.amount for p in products), dtype=np.float64, count=n)
+    expected = qty * unit_price
+    bad = (amount != 0) & (expected != 0) & (np.abs(amount - expected) > 0.01)
+    return [
+        ValidationError(
+            field=f"products[{i}].amount",
+            message=f"amount should equal qty * unit_price ({float(expected[i])})",
+            value=str(float(amount[i])),
+        )
+        for i in np.flatnonzero(bad)
+    ]
+
+
+# Fork + pickle overhead only pays off on very large lists, and only matters
+# when NumPy is unavailable (the vectorized path handles everything above
+# _VECTORIZE_MIN_PRODUCTS otherwise).
+_PARALLEL_MIN_PRODUCTS = 2000
+
+
+def _validate_chunk(args: tuple[list[Product], int]) -> list[ValidationError]:
+    """Validate a contiguous slice of products; start is its offset in the full list."""
+    products, start = args
+    errors: list[ValidationError] = []
+    for i, product in enumerate(products, start=start):
+        errors.extend(_validate_product(product, i))
+    return errors
+
+
+def _validate_products_parallel(products: list[Product]) -> list[ValidationError]:
+    """Split products across cores; chunks map back in order, so indices stay sorted."""
+    workers = os.cpu_count() or 1
+    chunk_size = -(-len(products) // workers)
+    chunks = [(products[i:i + chunk_size], i) for i in range(0, len(products), chunk_size)]
+    errors: list[ValidationError] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_validate_chunk, chunks):
+            errors.extend(part)
+    return errors
+
+
 def validate_sq_data(data: SQStructuredData) -> list[ValidationError]:
     """Run rule checks on extracted SQ data."""
+    products = data.products
+    if len(products) >= _VECTORIZE_MIN_PRODUCTS:
+        try:
+            return _validate_products_vectorized(products)
+        except ImportError:
+            pass
+    if len(products) > _PARALLEL_MIN_PRODUCTS and (os.cpu_count() or 1) > 1:
+        return _validate_products_parallel(products)
     errors: list[ValidationError] = []
-    for i, product in enumerate(data.products):
+    for i, product in enumerate(products):
         errors.extend(_validate_product(product, i))
     return errors